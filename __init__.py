@@ -5,20 +5,23 @@
 
 from __future__ import annotations
 
-import sys, re
-from typing import Dict, Any, List, Set, Optional
+import sys, re, functools
+from typing import TYPE_CHECKING, Dict, Any, List, Set, Optional, Sequence, Tuple, NamedTuple
 
+from anki.utils import ids2str
 from aqt import mw, gui_hooks, dialogs
-from aqt.qt import (
-    QAction, QApplication, QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
-    QLabel, QLineEdit, QTextEdit, QComboBox, QPushButton, QSizePolicy, QFont,
-    QShortcut, QKeySequence, QProgressBar
-)
+# Só o necessário no carregamento (menu/atalho, e QDialog como classe
+# base); widgets dos diálogos são importados sob demanda.
+from aqt.qt import QAction, QApplication, QDialog, QShortcut, QKeySequence
 from aqt.utils import showInfo, tooltip
 
+if TYPE_CHECKING:
+    from aqt.qt import QFont
+
 # -----------------------------
 # Resolve Add-on ID (config persistence)
 # -----------------------------
+@functools.lru_cache(maxsize=1)
 def _addon_id() -> str:
     try:
         return mw.addonManager.addonFromModule(__name__) or __name__
@@ -30,13 +33,6 @@ ADDON_ID = _addon_id()
 # -----------------------------
 # Qt5/Qt6 shims
 # -----------------------------
-try:
-    SP_EXPANDING = QSizePolicy.Policy.Expanding
-    SP_FIXED = QSizePolicy.Policy.Fixed
-except AttributeError:  # Qt5
-    SP_EXPANDING = QSizePolicy.Expanding
-    SP_FIXED = QSizePolicy.Fixed
-
 def QtAlign_Left():
     try:
         from aqt.qt import Qt
@@ -45,7 +41,10 @@ def QtAlign_Left():
         from aqt.qt import Qt
         return Qt.AlignLeft  # Qt5
 
+@functools.lru_cache(maxsize=1)
 def make_mono_font() -> QFont:
+    # Sondagem de famílias/hints roda uma vez por processo; setFont copia.
+    from aqt.qt import QFont
     f = QFont()
     families = [
         "Menlo", "Consolas", "Monaco", "Courier New",
@@ -61,8 +60,7 @@ def make_mono_font() -> QFont:
             except Exception:
                 continue
     try:
-        from aqt.qt import QFont as _QF
-        f.setStyleHint(_QF.StyleHint.Monospace)  # Qt6
+        f.setStyleHint(QFont.StyleHint.Monospace)  # Qt6
     except Exception:
         for hint_name in ("Monospace", "TypeWriter"):
             try:
@@ -85,6 +83,25 @@ DEFAULT_STEP_LABEL = "Step 1"
 UWORLD_SEGMENT_V12 = "::#UWorld::Step::"
 UWORLD_SEGMENT_V11 = "::#UWorld::"
 
+# Limite de "IDs without cards" exibidos no resumo; a lista completa
+# sai pelo botão 'Copy "IDs without cards"'.
+MAX_IDS_WITHOUT_CARDS_SHOWN = 2000
+
+_SUMMARY_FMT = (
+    "Total IDs: {total_ids_input}\n"
+    "Total cards: {total_cards}\n"
+    "Total IDs without cards: {total_ids_without_cards}\n"
+    "IDs (search syntax): {ids_syntax}\n"
+    "IDs without cards: {ids_without_cards_str}"
+)
+
+_SUMMARY_DEFAULTS: Dict[str, Any] = {
+    "total_ids_input": 0,
+    "total_cards": 0,
+    "total_ids_without_cards": 0,
+    "ids_syntax": "",
+}
+
 def _platform_default_shortcut() -> str:
     return "Meta+Alt+U" if sys.platform == "darwin" else "Ctrl+Alt+U"
 
@@ -94,7 +111,13 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "shortcut": "",
 }
 
+# Config resolvida em memória; só _write_config a atualiza.
+_CONFIG_CACHE: Optional[Dict[str, Any]] = None
+
 def _get_config() -> Dict[str, Any]:
+    if _CONFIG_CACHE is not None:
+        return dict(_CONFIG_CACHE)
+
     cfg = mw.addonManager.getConfig(ADDON_ID) or {}
     for k, v in DEFAULT_CONFIG.items():
         cfg.setdefault(k, v)
@@ -108,9 +131,20 @@ def _get_config() -> Dict[str, Any]:
     if not cfg.get("shortcut"):
         cfg["shortcut"] = _platform_default_shortcut()
         _write_config(cfg)
+    else:
+        _set_config_cache(cfg)
     return cfg
 
+def _set_config_cache(cfg: Dict[str, Any]) -> None:
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = dict(cfg)
+
+def _invalidate_config_cache() -> None:
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = None
+
 def _write_config(cfg: Dict[str, Any]) -> None:
+    _set_config_cache(cfg)
     try:
         mw.addonManager.writeConfig(ADDON_ID, cfg)
     except Exception:
@@ -125,25 +159,38 @@ def _normalize_version_prefix(deck_version_value: str) -> str:
         s = VERSION_VALUE[DEFAULT_VERSION_LABEL]
     return s if s.startswith("#") else f"#{s}"
 
+# Tabela de bytes: dígitos ASCII ficam, todo o resto vira espaço.
+_DIGIT_KEEP = bytes(i if 48 <= i <= 57 else 32 for i in range(256))
+# Remove o que aparece numa lista "limpa" (dígitos, vírgulas, espaços).
+_PLAIN_IDS_CHARS = str.maketrans("", "", "0123456789, \t\r\n")
+
 def _extract_unique_int_strings(raw: str) -> List[str]:
-    ids = [m.group(0) for m in re.finditer(r"\d+", raw or "")]
-    seen, out = set(), []
-    for x in ids:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
+    raw = raw or ""
+    # Caminho rápido para o caso comum "1,2,3" / "1 2 3": só split.
+    if not raw.translate(_PLAIN_IDS_CHARS):
+        return list(dict.fromkeys(raw.replace(",", " ").split()))
 
-def _esc(s: str) -> str:
-    return s.replace('"', r'\"')
+    # translate + split rodam em C sobre o buffer inteiro. "replace" (e não
+    # "ignore") para que um caractere não-ASCII continue separando números.
+    b = raw.encode("ascii", "replace").translate(_DIGIT_KEEP)
+    # dict.fromkeys deduplica preservando a ordem de entrada
+    return [t.decode("ascii") for t in dict.fromkeys(b.split())]
 
-def _tag_prefix(deck_version_value: str) -> str:
-    base = _normalize_version_prefix(deck_version_value)
+_ESC_TABLE = str.maketrans({'"': r'\"'})
+
+def _esc(s: str) -> str:
+    return s.translate(_ESC_TABLE)
 
+def _is_v11_style(deck_version_value: str) -> bool:
     # Step3 V12 ainda usa tags no formato "V11-style":
     #   #AK_Step3_v12::#UWorld::...::...::12345
-    # então precisa usar UWORLD_SEGMENT_V11.
-    if deck_version_value.endswith("_v11") or deck_version_value == "AK_Step3_v12":
+    return deck_version_value.endswith("_v11") or deck_version_value == "AK_Step3_v12"
+
+def _build_tag_prefix(deck_version_value: str) -> str:
+    base = _normalize_version_prefix(deck_version_value)
+
+    # Formato "V11-style" precisa usar UWORLD_SEGMENT_V11.
+    if _is_v11_style(deck_version_value):
         return base + UWORLD_SEGMENT_V11
 
     # Demais casos V12 mantêm o formato novo:
@@ -151,15 +198,111 @@ def _tag_prefix(deck_version_value: str) -> str:
     #   #AK_Step2_v12::#UWorld::Step::12345
     return base + UWORLD_SEGMENT_V12
 
-def build_tag_or_query(ids: List[str], deck_version_value: str) -> str:
-    prefix = _tag_prefix(deck_version_value)
-    ids = [i.strip() for i in ids if i and i.strip()]
+# Só os metacaracteres do crate regex (Rust) usado pelo Anki; re.escape
+# também escaparia "#", o que versões antigas do Anki rejeitam.
+_RE_META = re.compile(r"[\\.^$|?*+()\[\]{}]")
+
+def _re_esc(s: str) -> str:
+    return _RE_META.sub(lambda m: "\\" + m.group(0), s)
+
+class _TagCtx(NamedTuple):
+    prefix: str        # ex.: "#AK_Step1_v12::#UWorld::Step::"
+    esc_prefix: str    # para tag:"..."
+    re_prefix: str     # para "tag:re:..."
+    is_v11_style: bool
+
+def _build_tag_ctx(deck_version_value: str) -> _TagCtx:
+    prefix = _build_tag_prefix(deck_version_value)
+    return _TagCtx(
+        prefix=prefix,
+        esc_prefix=_esc(prefix),
+        re_prefix=_esc(_re_esc(prefix)),
+        is_v11_style=_is_v11_style(deck_version_value),
+    )
+
+# Todos os valores que o diálogo pode gerar (AK_Step{n}_v11/v12), já
+# resolvidos; qualquer outro valor cai no cálculo completo.
+_TAG_CTX: Dict[str, _TagCtx] = {
+    v: _build_tag_ctx(v)
+    for n in range(1, len(STEP_LABELS) + 1)
+    for v in (f"AK_Step{n}_v12", f"AK_Step{n}_v11")
+}
+
+def _tag_ctx(deck_version_value: str) -> _TagCtx:
+    ctx = _TAG_CTX.get(deck_version_value)
+    return ctx if ctx is not None else _build_tag_ctx(deck_version_value)
+
+def _build_tag_query(ids: List[str], ctx: _TagCtx) -> str:
+    # IDs vêm de _extract_unique_int_strings (só dígitos, sem vazios nem
+    # espaços): nada a limpar ou escapar neles; o prefixo já vem escapado
+    # no contexto.
+    if not ids:
+        return ""
+
+    if len(ids) == 1:
+        return f'(tag:"{ctx.esc_prefix}{ids[0]}")'
+
+    # Uma única busca regex (tag:re:) em vez de N termos tag:"..." unidos
+    # por OR; "(::|$)" preserva o casamento com tags-filhas.
+    alternation = "|".join(ids)
+    return f'"tag:re:^{ctx.re_prefix}({alternation})(::|$)"'
+
+# Até quantas IDs a sintaxe V11 fica na forma literal tag:"...*::ID", mais
+# legível para o usuário; acima disso vira um único "tag:re:".
+V11_LITERAL_QUERY_MAX_IDS = 64
+
+def _build_tag_query_v11(ids: List[str], ctx: _TagCtx) -> str:
     if not ids:
         return ""
-    parts = [f'tag:"{_esc(prefix + i)}"' for i in ids]
-    return "(" + " OR ".join(parts) + ")"
 
-def _compute_ids_summary_v11(deck_version_value: str, ids: List[str]) -> Dict[str, Any]:
+    if len(ids) <= V11_LITERAL_QUERY_MAX_IDS:
+        return "(" + " OR ".join(f'tag:"{ctx.esc_prefix}*::{i}"' for i in ids) + ")"
+
+    # Mesmo casamento do "*" (qualquer trecho, inclusive "::") e das
+    # tags-filhas, numa única regex em vez de N termos com curinga.
+    alternation = "|".join(ids)
+    return f'"tag:re:^{ctx.re_prefix}.*::({alternation})(::|$)"'
+
+def build_tag_or_query(ids: List[str], deck_version_value: str) -> str:
+    return _build_tag_query(ids, _tag_ctx(deck_version_value))
+
+# Listas "in (...)" enormes estouram limites do parser do SQLite; as
+# consultas por nid vão em lotes deste tamanho.
+SQL_IN_CHUNK_SIZE = 900
+
+def _chunks(seq: Sequence, size: int = SQL_IN_CHUNK_SIZE):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def _note_tags(nids: Sequence[int]) -> List[str]:
+    tags: List[str] = []
+    for chunk in _chunks(nids):
+        tags.extend(mw.col.db.list(f"select tags from notes where id in {ids2str(chunk)}"))
+    return tags
+
+def _note_id_tags(nids: Sequence[int]) -> List[Tuple[int, str]]:
+    rows: List[Tuple[int, str]] = []
+    for chunk in _chunks(nids):
+        rows.extend(mw.col.db.all(f"select id, tags from notes where id in {ids2str(chunk)}"))
+    return rows
+
+def _card_count(nids: Sequence[int]) -> int:
+    # Busca por tag casa notas inteiras: os cards encontrados são todos os
+    # cards dessas notas, então basta contá-los (sem um find_cards extra).
+    return sum(
+        mw.col.db.scalar(f"select count() from cards where nid in {ids2str(chunk)}")
+        for chunk in _chunks(nids)
+    )
+
+@functools.lru_cache(maxsize=8)
+def _prefixed_tag_re(prefix: str) -> "re.Pattern[str]":
+    # Casa tags (separadas por espaço) que começam com o prefixo e captura o
+    # restante. Compilado uma vez por prefixo.
+    return re.compile(r"(?i)(?<!\S)" + re.escape(prefix) + r"(\S*)")
+
+def _compute_ids_summary_v11(
+    ctx: _TagCtx, ids: List[str], include_card_count: bool = True
+) -> Dict[str, Any]:
     result: Dict[str, Any] = {
         "total_ids_input": len(ids),
         "total_cards": 0,
@@ -171,37 +314,43 @@ def _compute_ids_summary_v11(deck_version_value: str, ids: List[str]) -> Dict[st
     if not ids:
         return result
 
-    prefix_base = _tag_prefix(deck_version_value)
-
-    all_cids: Set[int] = set()
-    ids_without: List[str] = []
-
-    for id_s in ids:
-        q_tag = f'tag:"{_esc(prefix_base)}*::{_esc(id_s)}"'
-        cids = set(mw.col.find_cards(q_tag))
-        if not cids:
-            ids_without.append(id_s)
-        all_cids.update(cids)
-
-    if ids:
-        parts = [
-            f'tag:"{_esc(prefix_base)}*::{_esc(i)}"'
-            for i in ids
-        ]
-        ids_syntax = "(" + " OR ".join(parts) + ")"
-    else:
-        ids_syntax = ""
-
-    result["total_cards"] = len(all_cids)
+    ids_syntax = _build_tag_query_v11(ids, ctx)
+
+    # A sintaxe com N termos "*" vira N regex por nota no Anki. Para contar,
+    # basta uma busca ancorada só no prefixo base; a atribuição às IDs é
+    # feita aqui, lendo uma vez as tags dessas notas. "*" casa qualquer
+    # trecho (inclusive "::"), então o ID pode ser qualquer segmento após o
+    # primeiro; tags-filhas (...::ID::x) também contam, como no Anki.
+    # O regex separa, em C, só as tags com o prefixo (notas costumam ter
+    # dezenas de outras tags).
+    # find_notes já devolve uma sequência indexável: sem cópia extra.
+    base_nids: Sequence[int] = mw.col.find_notes(f'tag:"{ctx.esc_prefix}*"')
+
+    tag_re = _prefixed_tag_re(ctx.prefix)
+    id_set = set(ids)
+    present: Set[str] = set()
+    nids: List[int] = []
+    for nid, blob in _note_id_tags(base_nids):
+        hit = False
+        for tail in tag_re.findall(blob):
+            found = id_set.intersection(tail.split("::")[1:])
+            if found:
+                present.update(found)
+                hit = True
+        if hit:
+            nids.append(nid)
+    ids_without: List[str] = [i for i in ids if i not in present]
+
+    result["total_cards"] = _card_count(nids) if include_card_count else None
     result["total_ids_without_cards"] = len(ids_without)
     result["ids_without_cards"] = ids_without
     result["ids_syntax"] = ids_syntax
 
     return result
 
-def compute_ids_summary(deck_version_value: str, ids_questions: str) -> Dict[str, Any]:
-    ids = _extract_unique_int_strings(ids_questions)
-
+def _compute_ids_summary_v12(
+    ctx: _TagCtx, ids: List[str], include_card_count: bool = True
+) -> Dict[str, Any]:
     result: Dict[str, Any] = {
         "total_ids_input": len(ids),
         "total_cards": 0,
@@ -213,42 +362,99 @@ def compute_ids_summary(deck_version_value: str, ids_questions: str) -> Dict[str
     if not ids:
         return result
 
-    # Step3 V12 deve usar exatamente a mesma lógica de busca do V11,
-    # apenas trocando o prefixo para AK_Step3_v12.
-    is_v11_style = deck_version_value.endswith("_v11") or deck_version_value == "AK_Step3_v12"
-
-    if is_v11_style:
-        return _compute_ids_summary_v11(deck_version_value, ids)
-
-    # V12 "puro" (Step1, Step2 já no formato novo)
-    ids_syntax = build_tag_or_query(ids, deck_version_value)
+    ids_syntax = _build_tag_query(ids, ctx)
     result["ids_syntax"] = ids_syntax
 
     if not ids_syntax:
         return result
 
-    cids_all: Set[int] = set(mw.col.find_cards(ids_syntax))
+    # A mesma sintaxe que vai para o Browser: uma única busca na coleção.
+    nids: Sequence[int] = mw.col.find_notes(ids_syntax)
 
-    prefix = _tag_prefix(deck_version_value)
-    ids_without: List[str] = []
-    for id_s in ids:
-        q_tag = f'tag:"{_esc(prefix + id_s)}"'
-        cids = set(mw.col.find_cards(q_tag))
-        if not cids:
-            ids_without.append(id_s)
+    # Uma única leitura das tags das notas encontradas, em vez de um
+    # find_cards por ID. Busca de tags no Anki é case-insensitive e
+    # tag:"x" também casa com tags-filhas (x::...).
+    tag_re = _prefixed_tag_re(ctx.prefix)
+    present: Set[str] = set()
+    for blob in _note_tags(nids):
+        present.update(tail.split("::", 1)[0] for tail in tag_re.findall(blob))
+    ids_without: List[str] = [i for i in ids if i not in present]
 
-    result["total_cards"] = len(cids_all)
+    result["total_cards"] = _card_count(nids) if include_card_count else None
     result["total_ids_without_cards"] = len(ids_without)
     result["ids_without_cards"] = ids_without
 
     return result
 
+@functools.lru_cache(maxsize=32)
+def _cached_summary(
+    deck_version_value: str, ids_key: Tuple[str, ...], include_card_count: bool
+) -> Dict[str, Any]:
+    ids = list(ids_key)
+    # Prefixo, prefixo escapado e estilo resolvidos uma vez por busca.
+    ctx = _tag_ctx(deck_version_value)
+
+    # Step3 V12 deve usar exatamente a mesma lógica de busca do V11,
+    # apenas trocando o prefixo para AK_Step3_v12.
+    if ctx.is_v11_style:
+        return _compute_ids_summary_v11(ctx, ids, include_card_count)
+
+    # V12 "puro" (Step1, Step2 já no formato novo)
+    return _compute_ids_summary_v12(ctx, ids, include_card_count)
+
+def compute_ids_summary(
+    deck_version_value: str, ids: List[str], include_card_count: bool = True
+) -> Dict[str, Any]:
+    # include_card_count=False pula a contagem de cards (total_cards fica
+    # None) para quem só precisa da sintaxe e das IDs sem cards; o Browser
+    # mostra a contagem de qualquer forma.
+    if not ids:
+        return {
+            "total_ids_input": 0,
+            "total_cards": 0,
+            "total_ids_without_cards": 0,
+            "ids_syntax": "",
+            "ids_without_cards": [],
+        }
+
+    # Chave na ordem colada: a sintaxe de busca e "IDs without cards" saem
+    # na mesma ordem da entrada.
+    summary = dict(
+        _cached_summary(deck_version_value, tuple(ids), include_card_count)
+    )
+    summary["ids_without_cards"] = list(summary["ids_without_cards"])
+    return summary
+
+def clear_cache() -> None:
+    _cached_summary.cache_clear()
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    fields = {**_SUMMARY_DEFAULTS, **summary}
+
+    if fields["total_cards"] is None:
+        fields["total_cards"] = "— (see Open in Browser)"
+
+    ids_without = fields.get("ids_without_cards") or []
+    shown = ids_without[:MAX_IDS_WITHOUT_CARDS_SHOWN]
+    ids_without_str = ", ".join(shown)
+    if len(ids_without) > len(shown):
+        ids_without_str += f" (+{len(ids_without) - len(shown)} more)"
+    fields["ids_without_cards_str"] = ids_without_str
+
+    return _SUMMARY_FMT.format_map(fields)
+
 
 # -----------------------------
 # UI - Main Dialog
 # -----------------------------
 class UWorldIdsDialog(QDialog):
     def __init__(self, parent=None):
+        # Widgets só usados nos diálogos: importados sob demanda para não
+        # pesar no carregamento do add-on.
+        from aqt.qt import (
+            QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QTextEdit,
+            QComboBox, QPushButton, QProgressBar, QTimer
+        )
         super().__init__(parent)
         self.setWindowTitle("UWorld IDs → tags → cards")
         self.setMinimumWidth(760)
@@ -296,6 +502,8 @@ class UWorldIdsDialog(QDialog):
         self.btnRun = QPushButton("Run")
         self.btnCopySyntax = QPushButton('Copy "IDs (search syntax)"')
         self.btnCopySyntax.setEnabled(False)
+        self.btnCopyMissing = QPushButton('Copy "IDs without cards"')
+        self.btnCopyMissing.setEnabled(False)
         self.btnOpenBrowser = QPushButton("Open in Browser")
         self.btnOpenBrowser.setEnabled(False)
 
@@ -310,6 +518,7 @@ class UWorldIdsDialog(QDialog):
 
         btn_row.addWidget(self.btnRun)
         btn_row.addWidget(self.btnCopySyntax)
+        btn_row.addWidget(self.btnCopyMissing)
         btn_row.addWidget(self.btnOpenBrowser)
         btn_row.addStretch(1)
         btn_row.addWidget(self.lblStatus)
@@ -330,30 +539,52 @@ class UWorldIdsDialog(QDialog):
         )
         root.addWidget(self.outSummary)
 
-        self.cmbVersion.currentTextChanged.connect(self._persist_version_now)
-        self.cmbStep.currentTextChanged.connect(self._persist_version_now)
+        # Trocas rápidas nos combos viram uma única gravação da config.
+        self._persist_timer = QTimer(self)
+        self._persist_timer.setSingleShot(True)
+        self._persist_timer.setInterval(250)
+        self._persist_timer.timeout.connect(self._flush_cfg)
+
+        # currentIndexChanged só dispara em trocas reais de seleção.
+        self.cmbVersion.currentIndexChanged.connect(self._persist_version_now)
+        self.cmbStep.currentIndexChanged.connect(self._persist_version_now)
 
         self.btnRun.clicked.connect(self.run_query)
         self.btnCopySyntax.clicked.connect(self.copy_syntax)
+        self.btnCopyMissing.clicked.connect(self.copy_ids_without_cards)
         self.btnOpenBrowser.clicked.connect(self.open_in_browser)
 
         self.txtIds.setFocus()
 
         self._last_summary: Dict[str, Any] = {}
-
-    def _persist_version_now(self):
-        cfg = _get_config()
-
+        self._has_results = False
+        # _inflight impede buscas sobrepostas; _run_token invalida uma busca
+        # pendente quando o diálogo fecha.
+        self._inflight = False
+        self._run_token = 0
+
+    def _persist_version_now(self, *_args):
+        # Atualiza só a cópia em memória; a gravação em disco fica para o
+        # timer (_flush_cfg).
         label = self.cmbVersion.currentText()
         if label not in VERSION_LABELS:
             label = DEFAULT_VERSION_LABEL
-        cfg["deck_version_label"] = label
+        self._cfg["deck_version_label"] = label
 
         step_label = self.cmbStep.currentText()
         if step_label not in STEP_LABELS:
             step_label = DEFAULT_STEP_LABEL
-        cfg["step_label"] = step_label
+        self._cfg["step_label"] = step_label
+
+        self._persist_timer.start()
 
+    def _flush_cfg(self):
+        self._persist_timer.stop()
+        # Parte da config atual para não sobrescrever o atalho, que pode ter
+        # sido alterado pelo diálogo de configurações.
+        cfg = _get_config()
+        cfg["deck_version_label"] = self._cfg["deck_version_label"]
+        cfg["step_label"] = self._cfg["step_label"]
         _write_config(cfg)
 
     def _current_version_value(self) -> str:
@@ -377,39 +608,55 @@ class UWorldIdsDialog(QDialog):
             return f"AK_Step{step_num}_v12"
 
     def _set_busy(self, busy: bool):
+        self._inflight = busy
         if busy:
             self.lblStatus.setText("Searching…")
             self.progress.setRange(0, 0)
             self.progress.setVisible(True)
             self.btnRun.setEnabled(False)
             self.btnCopySyntax.setEnabled(False)
+            self.btnCopyMissing.setEnabled(False)
             self.btnOpenBrowser.setEnabled(False)
-            self.lblStatus.repaint()
-            self.progress.repaint()
-            QApplication.processEvents()
+            # Sem processEvents(): run_in_background devolve o controle ao
+            # event loop logo em seguida, que pinta o indicador sem reentrar
+            # em run_query pelo atalho/botões.
+            self.progress.update()
         else:
             self.progress.setRange(0, 1)
             self.progress.setValue(1)
             self.progress.setVisible(False)
             self.lblStatus.setText("Done ✓")
             self.btnRun.setEnabled(True)
-            enable = bool(self._last_summary.get("ids_syntax"))
+            enable = self._has_results
             self.btnCopySyntax.setEnabled(enable)
             self.btnOpenBrowser.setEnabled(enable)
-            self.lblStatus.repaint()
-            QApplication.processEvents()
+            self.btnCopyMissing.setEnabled(
+                bool(self._last_summary.get("ids_without_cards"))
+            )
 
     def run_query(self):
+        if self._inflight:
+            return
+
         deck_version_value = self._current_version_value()
-        ids_questions = self.txtIds.toPlainText()
+        ids = _extract_unique_int_strings(self.txtIds.toPlainText())
 
         self._persist_version_now()
         self._set_busy(True)
+        self._run_token += 1
+        token = self._run_token
 
         def work(_progress=None):
-            return compute_ids_summary(deck_version_value, ids_questions)
+            if token != self._run_token:
+                return None
+            return compute_ids_summary(deck_version_value, ids)
 
         def on_done(fut):
+            if token != self._run_token:
+                # Diálogo fechado durante a busca: descarta o resultado (e o
+                # que a busca tenha deixado no cache).
+                clear_cache()
+                return
             try:
                 summary = fut.result()
             except Exception as e:
@@ -418,14 +665,8 @@ class UWorldIdsDialog(QDialog):
 
             try:
                 self._last_summary = summary or {}
-                lines = [
-                    f'Total IDs: {self._last_summary.get("total_ids_input", 0)}',
-                    f'Total cards: {self._last_summary.get("total_cards", 0)}',
-                    f'Total IDs without cards: {self._last_summary.get("total_ids_without_cards", 0)}',
-                    f'IDs (search syntax): {self._last_summary.get("ids_syntax", "")}',
-                    f'IDs without cards: {", ".join(self._last_summary.get("ids_without_cards", []))}',
-                ]
-                self.outSummary.setPlainText("\n".join(lines))
+                self._has_results = bool(self._last_summary.get("ids_syntax"))
+                self.outSummary.setPlainText(format_summary(self._last_summary))
                 tooltip("Query finished.", parent=self)
             finally:
                 self._set_busy(False)
@@ -440,6 +681,15 @@ class UWorldIdsDialog(QDialog):
         QApplication.clipboard().setText(syntax)
         tooltip("Search syntax copied to clipboard.", parent=self)
 
+    def copy_ids_without_cards(self):
+        # Lista completa, mesmo quando o resumo mostra só as primeiras.
+        ids_without = self._last_summary.get("ids_without_cards") or []
+        if not ids_without:
+            tooltip("No IDs without cards to copy.", parent=self)
+            return
+        QApplication.clipboard().setText(", ".join(ids_without))
+        tooltip("IDs without cards copied to clipboard.", parent=self)
+
     def open_in_browser(self):
         syntax = self._last_summary.get("ids_syntax") or ""
         if not syntax:
@@ -474,11 +724,23 @@ class UWorldIdsDialog(QDialog):
         tooltip("Opened in Browser.", parent=self)
         self.accept()
 
+    def done(self, r):
+        # accept/reject/fechar passam por aqui; resultados em cache só
+        # valem enquanto o diálogo está aberto.
+        if self._persist_timer.isActive():
+            self._flush_cfg()
+        self._run_token += 1
+        clear_cache()
+        super().done(r)
+
 # -----------------------------
 # Config Dialog
 # -----------------------------
 class ShortcutConfigDialog(QDialog):
     def __init__(self, parent=None):
+        from aqt.qt import (
+            QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit, QPushButton
+        )
         super().__init__(parent)
         self.setWindowTitle("UWorld IDs → tags → cards — Settings")
         self.setMinimumWidth(480)
@@ -543,10 +805,23 @@ class ShortcutConfigDialog(QDialog):
 # -----------------------------
 _menu_action: Optional[QAction] = None
 _global_shortcut: Optional[QShortcut] = None
+_dialog: Optional[UWorldIdsDialog] = None
 
 def open_dialog():
-    dlg = UWorldIdsDialog(mw)
-    dlg.exec()
+    global _dialog
+    # Atalho global/botões com o diálogo já aberto: só traz para frente
+    # (e nada faz durante uma busca), em vez de empilhar outra instância.
+    if _dialog is not None:
+        if not _dialog._inflight:
+            _dialog.activateWindow()
+            _dialog.raise_()
+        return
+
+    _dialog = UWorldIdsDialog(mw)
+    try:
+        _dialog.exec()
+    finally:
+        _dialog = None
 
 def open_config_dialog():
     dlg = ShortcutConfigDialog(mw)
@@ -573,6 +848,9 @@ def _apply_shortcut_from_config():
 def on_profile_open():
     global _menu_action
 
+    # Troca de perfil: relê a config do disco na próxima leitura.
+    _invalidate_config_cache()
+
     try:
         mw.addonManager.setConfigAction(ADDON_ID, open_config_dialog)
     except Exception:
@@ -594,77 +872,93 @@ gui_hooks.profile_did_open.append(on_profile_open)
 # -----------------------------
 # Top toolbar button (MANTIDO - área superior direita)
 # -----------------------------
-def on_top_toolbar_redraw(toolbar):
-    """
-    Adiciona um botão na área superior direita (ao lado dos outros add-ons).
-    """
-    toolbar.link_handlers["uworld_ids"] = open_dialog
+# Script do botão, reduzido a uma linha uma única vez no import (todas as
+# instruções terminam em ";", então juntar as linhas é seguro; comentários
+# só no formato /* */).
+_TOOLBAR_JS = " ".join(r"""
+(function() {
+    var btnId = 'uworld-ids-btn';
+    if (document.getElementById(btnId)) {
+        return;
+    }
 
-    js = r"""
-    (function() {
-        var btnId = 'uworld-ids-btn';
-        if (document.getElementById(btnId)) {
-            return;
-        }
+    /* Container resolvido num redraw anterior (se ainda estiver no DOM)
+       evita refazer a varredura de todas as <div>. */
+    var topRight = window.__uworldTopRight;
+    if (topRight && !document.body.contains(topRight)) {
+        topRight = null;
+    }
 
-        var topRight = document.querySelector('.top-right') || 
-                       document.querySelector('.topbuts') ||
-                       document.querySelector('.tdright');
-        
-        if (!topRight) {
-            var allDivs = document.querySelectorAll('div');
-            for (var i = 0; i < allDivs.length; i++) {
-                if (allDivs[i].style.float === 'right' || 
-                    allDivs[i].align === 'right' ||
-                    allDivs[i].className.includes('right')) {
-                    topRight = allDivs[i];
-                    break;
-                }
+    if (!topRight) {
+        topRight = document.querySelector('.top-right') ||
+                   document.querySelector('.topbuts') ||
+                   document.querySelector('.tdright');
+    }
+
+    if (!topRight) {
+        var allDivs = document.querySelectorAll('div');
+        for (var i = 0; i < allDivs.length; i++) {
+            if (allDivs[i].style.float === 'right' || 
+                allDivs[i].align === 'right' ||
+                allDivs[i].className.includes('right')) {
+                topRight = allDivs[i];
+                break;
             }
         }
+    }
 
-        if (!topRight) {
-            console.log('UWorld IDs: Could not find top-right container');
-            return;
-        }
+    if (!topRight) {
+        console.log('UWorld IDs: Could not find top-right container');
+        return;
+    }
+    window.__uworldTopRight = topRight;
+
+    var btn = document.createElement('button');
+    btn.id = btnId;
+    btn.textContent = 'UWIds→Cards';
+    btn.title = 'UWorld IDs → tags → cards';
+    btn.style.cssText = `
+        background: transparent;
+        border: 1px solid rgba(255,255,255,0.3);
+        color: var(--fg);
+        padding: 4px 8px;
+        margin: 0 4px;
+        border-radius: 4px;
+        cursor: pointer;
+        font-size: 12px;
+        font-weight: bold;
+        transition: all 0.2s;
+    `;
+    
+    btn.onmouseover = function() {
+        this.style.background = 'rgba(255,255,255,0.1)';
+        this.style.borderColor = 'rgba(255,255,255,0.5)';
+    };
+    
+    btn.onmouseout = function() {
+        this.style.background = 'transparent';
+        this.style.borderColor = 'rgba(255,255,255,0.3)';
+    };
+    
+    btn.onclick = function(e) {
+        e.preventDefault();
+        pycmd('uworld_ids');
+        return false;
+    };
 
-        var btn = document.createElement('button');
-        btn.id = btnId;
-        btn.textContent = 'UWIds→Cards';
-        btn.title = 'UWorld IDs → tags → cards';
-        btn.style.cssText = `
-            background: transparent;
-            border: 1px solid rgba(255,255,255,0.3);
-            color: var(--fg);
-            padding: 4px 8px;
-            margin: 0 4px;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 12px;
-            font-weight: bold;
-            transition: all 0.2s;
-        `;
-        
-        btn.onmouseover = function() {
-            this.style.background = 'rgba(255,255,255,0.1)';
-            this.style.borderColor = 'rgba(255,255,255,0.5)';
-        };
-        
-        btn.onmouseout = function() {
-            this.style.background = 'transparent';
-            this.style.borderColor = 'rgba(255,255,255,0.3)';
-        };
-        
-        btn.onclick = function(e) {
-            e.preventDefault();
-            pycmd('uworld_ids');
-            return false;
-        };
-
-        topRight.insertBefore(btn, topRight.firstChild);
-    })();
+    topRight.insertBefore(btn, topRight.firstChild);
+})();
+""".split())
+
+def on_top_toolbar_redraw(toolbar):
     """
-    toolbar.web.eval(js)
+    Adiciona um botão na área superior direita (ao lado dos outros add-ons).
+    """
+    # O handler persiste entre redraws; o DOM não, por isso o script roda
+    # sempre (ele mesmo sai cedo se o botão já existe).
+    if "uworld_ids" not in toolbar.link_handlers:
+        toolbar.link_handlers["uworld_ids"] = open_dialog
+    toolbar.web.eval(_TOOLBAR_JS)
 
 gui_hooks.top_toolbar_did_redraw.append(on_top_toolbar_redraw)
 
@@ -685,11 +979,11 @@ def add_browser_menu(browser):
 
 def add_browser_toolbar_button(browser):
     """Adiciona botão visual na área do Browser."""
-    # Evita duplicação
-    if getattr(browser, '_uworld_btn_added', False):
-        return
-    
     try:
+        # Evita duplicação
+        if getattr(browser, '_uworld_btn_added', False):
+            return
+
         # Método 1: Tenta adicionar um botão na toolbar do browser
         if hasattr(browser, 'form'):
             # Procura por uma toolbar ou área de botões
@@ -702,6 +996,7 @@ def add_browser_toolbar_button(browser):
                 toolbar = browser.form.toolbar
             
             if toolbar:
+                from aqt.qt import QPushButton
                 btn = QPushButton("📋 UWIds→Cards")
                 btn.setToolTip("Open UWorld IDs → tags → cards dialog")
                 btn.setStyleSheet("""
@@ -776,6 +1071,8 @@ def add_browser_toolbar_button(browser):
             
     except Exception as e:
         print(f"UWorld IDs: Erro ao adicionar botão ao Browser - {e}")
+    finally:
+        browser._uworld_btn_pending = False
 
 def handle_browser_pycmd(handled, message, context):
     """Handler para comandos do botão HTML no Browser."""
@@ -787,6 +1084,10 @@ def handle_browser_pycmd(handled, message, context):
 def on_browser_will_show(browser):
     """Chamado quando o Browser vai ser exibido."""
     from aqt.qt import QTimer
+    # Já adicionado ou já agendado (reabertura rápida): não agenda de novo.
+    if getattr(browser, '_uworld_btn_pending', False) or getattr(browser, '_uworld_btn_added', False):
+        return
+    browser._uworld_btn_pending = True
     # Delay para garantir que a UI está montada
     QTimer.singleShot(200, lambda: add_browser_toolbar_button(browser))
 